@@ -0,0 +1,47 @@
+import functools
+from collections import OrderedDict
+from typing import Any, Callable, Hashable, Optional
+
+_MISSING = object()
+
+
+class LRUCache(OrderedDict):
+    """OrderedDict bounded to maxsize entries; get() and stores count as a use."""
+
+    def __init__(self, maxsize: int):
+        super().__init__()
+        self.maxsize = maxsize
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        if key not in self:
+            return default
+        self.move_to_end(key)
+        return self[key]
+
+    def __setitem__(self, key: Hashable, value: Any) -> None:
+        super().__setitem__(key, value)
+        self.move_to_end(key)
+        if len(self) > self.maxsize:
+            self.popitem(last=False)
+
+
+def async_lru_cache(maxsize: int, key: Optional[Callable[..., Hashable]] = None):
+    """LRU cache for coroutine functions (functools.lru_cache would cache the coroutine object).
+
+    key maps the call arguments to the cache key; by default the arguments themselves are used.
+    """
+    def decorator(func):
+        cache = LRUCache(maxsize)
+
+        @functools.wraps(func)
+        async def wrapper(*args):
+            cache_key = args if key is None else key(*args)
+            result = cache.get(cache_key, _MISSING)
+            if result is _MISSING:
+                result = await func(*args)
+                cache[cache_key] = result
+            return result
+
+        wrapper.cache_clear = cache.clear
+        return wrapper
+    return decorator
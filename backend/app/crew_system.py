@@ -1,23 +1,65 @@
 import os
-import json
+import asyncio
+import hashlib
 import logging
 import re
-from typing import Dict, Any, Optional, List
+import string
+import weakref
+import httpx
+import orjson
+from collections import ChainMap
+from typing import Dict, Any, Optional, List, Mapping
 from langchain_groq import ChatGroq
+from langchain_core.messages import HumanMessage, SystemMessage
+from .cache import LRUCache
 from .mocks import MockCRM, MockPricingEngine, MockComplianceEngine
+from .state import (
+    ProposalRecord,
+    AUDIT_STARTED,
+    AUDIT_PROCESSED,
+    AUDIT_CRM_FETCHED,
+    AUDIT_ASKED_USER,
+    AUDIT_SUBMITTED,
+    AUDIT_DRAFT_ERROR,
+    AUDIT_FINALIZED,
+)
+from .parsing import parse_budget, strip_code_fence
+from .store import ProposalStore
 
 logger = logging.getLogger(__name__)
 
-# Initialize LLM
-llm = ChatGroq(model_name="llama-3.1-8b-instant", temperature=0.7)
-
-# In-memory storage for proposals
-proposals_store: Dict[str, Dict] = {}
-
-
-def extract_info_from_text(text: str, existing_data: Dict) -> Dict:
-    """Extract proposal information from user text using LLM."""
-    system = """You are a smart sales assistant analyzing a proposal conversation. Extract the following information from the user's message:
+# Shared HTTP/2 connection pool for Groq calls, so concurrent extractions are
+# multiplexed over kept-alive connections instead of re-handshaking TLS
+groq_http_client = httpx.AsyncClient(
+    transport=httpx.AsyncHTTPTransport(
+        http2=True,
+        retries=2,
+        limits=httpx.Limits(max_keepalive_connections=32, max_connections=64),
+    ),
+    timeout=20.0,
+)
+
+# Initialize LLM. Only short extraction/question calls go to the model, so a fast tier is enough
+llm = ChatGroq(
+    model_name=os.getenv("GROQ_FAST_MODEL", "llama-3.1-8b-instant"),
+    temperature=0.7,
+    http_async_client=groq_http_client,
+)
+
+# In-memory storage for proposals, capped so long uptimes don't grow without bound
+MAX_LIVE_PROPOSALS = int(os.getenv("MAX_LIVE_PROPOSALS", "10000"))
+proposals_store = ProposalStore(MAX_LIVE_PROPOSALS)
+
+# Basic fields needed before a draft can be generated
+REQUIRED_FIELDS = ("client_name", "deal_type", "budget", "timeline")
+
+# LRU cache of LLM extractions, keyed on the normalized prompt
+EXTRACTION_CACHE_SIZE = 1024
+_extraction_cache = LRUCache(EXTRACTION_CACHE_SIZE)
+
+# Static system prompt for extraction. Kept byte-identical across calls (no
+# interpolation) so Groq can reuse the cached prefix; only the human turn varies.
+EXTRACTION_SYSTEM_PROMPT = """You are a smart sales assistant analyzing a proposal conversation. Extract the following information from the user's message:
     
     Basic Info:
     - client_name: Name of the company/client (e.g., if user says "X is my company" or "proposal for X", extract X)
@@ -42,9 +84,59 @@ def extract_info_from_text(text: str, existing_data: Dict) -> Dict:
     
     Return ONLY valid JSON. Use null for missing values. Do NOT wrap in markdown code blocks.
     """
-    
-    from langchain_core.prompts import ChatPromptTemplate
-    from langchain_core.output_parsers import StrOutputParser
+
+
+# Patterns for fallback_extraction, compiled once at import
+_PRONOUNS_RE = re.compile(r'\b(that|this|it|them|those|these)\b', re.IGNORECASE)
+_PRONOUNS = frozenset(['that', 'this', 'it', 'them', 'those', 'these'])
+# Each pattern is paired with literals that must appear in the lowercased text
+# for it to possibly match; checking them first skips the backtracking scan.
+_ENTITY_WORDS = ("company", "client", "organization", "business")
+_CLIENT_PATTERNS = [
+    (keywords, re.compile(p, re.IGNORECASE)) for keywords, p in (
+        (_ENTITY_WORDS, r"([A-Z][A-Za-z\s&.,-]+?)\s+is\s+(?:my|the|our)\s+(?:company|client|organization|business)"),
+        (_ENTITY_WORDS, r"(?:company|client|organization|business)\s+is\s+([A-Z][A-Za-z\s&.,-]+)"),
+        (("proposal",), r"proposal\s+for\s+([A-Z][A-Za-z\s&.,-]+(?:Ltd|Inc|Corp|LLC|Pvt|Limited|Company|Corporation)?)"),
+        (("for",), r"for\s+([A-Z][A-Za-z]{2,}[\s&.,-]*(?:Ltd|Inc|Corp|LLC|Pvt|Limited|Company|Corporation)?)"),
+    )
+]
+_BUDGET_PATTERNS = [
+    re.compile(p, re.IGNORECASE) for p in (
+        r"\$?(\d+(?:,\d{3})*)\s*(?:k|thousand|K)",
+        r"budget\s+(?:of\s+)?\$?(\d+(?:,\d{3})*)\s*(?:k|thousand|K)?",
+        r"\$(\d+(?:,\d{3})*)",
+    )
+]
+_DIGIT_RE = re.compile(r"\d")
+# Confirmations and symbol-only input carry nothing to extract
+_TRIVIAL_RE = re.compile(r"^\s*(yes|yep|ok|okay|sure|go ahead|continue|proceed|y|n|no)\s*[.!]?\s*$", re.IGNORECASE)
+_NO_SIGNAL_RE = re.compile(r"^[\W_]*$")
+
+
+async def warm_up_llm() -> None:
+    """Open the pooled Groq connection with a 1-token request so the first user turn skips the handshake."""
+    try:
+        await llm.bind(max_tokens=1).ainvoke("ok")
+    except Exception as e:
+        logger.warning(f"LLM warm-up failed: {e}")
+
+
+def is_low_signal(text: str) -> bool:
+    """True when the text cannot plausibly add new proposal information."""
+    return bool(_TRIVIAL_RE.match(text) or _NO_SIGNAL_RE.match(text))
+
+
+def _extraction_cache_key(existing_info: str, text: str) -> str:
+    """Hash the variable part of the extraction prompt, ignoring whitespace noise."""
+    normalized = " ".join(text.split())
+    return hashlib.sha1(f"{existing_info}\x00{normalized}".encode()).hexdigest()
+
+
+async def extract_info_from_text(text: str, existing_data: Dict) -> Mapping:
+    """Extract proposal information from user text using LLM."""
+    if is_low_signal(text):
+        logger.info("Skipping LLM extraction for low-signal input")
+        return existing_data
     
     existing_info = "\n".join([f"- {k}: {v}" for k, v in existing_data.items() if v])
     human = f"""Existing Information:
@@ -54,306 +146,306 @@ New User Request: {text}
 
 Extract only NEW information from the user's request. Return JSON with only the fields that have new information."""
     
-    prompt = ChatPromptTemplate.from_messages([("system", system), ("human", human)])
-    chain = prompt | llm | StrOutputParser()
+    cache_key = _extraction_cache_key(existing_info, text)
+    cached = _extraction_cache.get(cache_key)
+    if cached is not None:
+        logger.info("Extraction cache hit")
+        extracted = cached
+    else:
+        extracted = await _extract_with_llm(human)
+        if extracted is not None:
+            _extraction_cache[cache_key] = extracted
+        else:
+            # Fallback pattern matching
+            extracted = fallback_extraction(text)
+    
+    # Layer new values over existing data instead of copying it
+    updates = {key: value for key, value in extracted.items() if value is not None and value != ""}
+    return ChainMap(updates, existing_data)
+
+
+async def _extract_with_llm(human: str) -> Optional[Dict]:
+    """Run the extraction prompt through the LLM. Returns None if the call or parse fails."""
+    # Raw messages rather than a prompt template: user text is never parsed
+    # for {placeholders} and the system prefix is sent exactly as defined.
+    messages = [SystemMessage(content=EXTRACTION_SYSTEM_PROMPT), HumanMessage(content=human)]
     
-    extracted = {}
     try:
-        response = chain.invoke({})
-        json_str = response.strip()
-        if "```json" in json_str:
-            json_str = json_str.split("```json")[1].split("```")[0]
-        elif "```" in json_str:
-            json_str = json_str.split("```")[1].split("```")[0]
-        extracted = json.loads(json_str)
+        response = await llm.ainvoke(messages)
+        extracted = orjson.loads(strip_code_fence(response.content))
         logger.info(f"Extracted from LLM: {extracted}")
         
         # Post-process budget if it's a string like "50k"
         if extracted.get("budget") and isinstance(extracted["budget"], str):
-            budget_str = extracted["budget"].lower().strip()
-            try:
-                if budget_str.endswith("k") or budget_str.endswith("thousand"):
-                    num = float(budget_str.replace("k", "").replace("thousand", "").strip())
-                    extracted["budget"] = int(num * 1000)
-                elif budget_str.endswith("m") or budget_str.endswith("million"):
-                    num = float(budget_str.replace("m", "").replace("million", "").strip())
-                    extracted["budget"] = int(num * 1000000)
-                else:
-                    # Try to parse as number
-                    extracted["budget"] = float(budget_str.replace(",", "").replace("$", "").strip())
-            except:
-                pass  # Keep original if parsing fails
+            budget_val = parse_budget(extracted["budget"])
+            # Keep original if parsing fails
+            if budget_val is not None:
+                extracted["budget"] = budget_val
     except Exception as e:
         logger.error(f"LLM Extraction failed: {e}")
-        # Fallback pattern matching
-        extracted = fallback_extraction(text)
-    
-    # Merge with existing data
-    result = existing_data.copy()
-    for key, value in extracted.items():
-        if value is not None and value != "":
-            result[key] = value
+        return None
     
-    return result
+    return extracted
 
 
 def fallback_extraction(text: str) -> Dict:
     """Fallback pattern-based extraction."""
     extracted = {}
-    pronouns = r'\b(that|this|it|them|those|these)\b'
+    lowered = text.lower()
     
     # Extract client_name
-    patterns = [
-        r"([A-Z][A-Za-z\s&.,-]+?)\s+is\s+(?:my|the|our)\s+(?:company|client|organization|business)",
-        r"(?:company|client|organization|business)\s+is\s+([A-Z][A-Za-z\s&.,-]+)",
-        r"proposal\s+for\s+([A-Z][A-Za-z\s&.,-]+(?:Ltd|Inc|Corp|LLC|Pvt|Limited|Company|Corporation)?)",
-        r"for\s+([A-Z][A-Za-z]{2,}[\s&.,-]*(?:Ltd|Inc|Corp|LLC|Pvt|Limited|Company|Corporation)?)",
-    ]
-    
-    for pattern in patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+    for keywords, pattern in _CLIENT_PATTERNS:
+        if not any(keyword in lowered for keyword in keywords):
+            continue
+        match = pattern.search(text)
         if match:
             potential_name = match.group(1).strip().rstrip('.')
             if (len(potential_name) > 2 and 
-                not re.match(pronouns, potential_name, re.IGNORECASE) and
-                potential_name.lower() not in ['that', 'this', 'it', 'them', 'those', 'these']):
+                not _PRONOUNS_RE.match(potential_name) and
+                potential_name.lower() not in _PRONOUNS):
                 extracted["client_name"] = potential_name
                 break
     
     # Extract budget (e.g., "50k", "$50k", "50 thousand")
-    budget_patterns = [
-        r"\$?(\d+(?:,\d{3})*)\s*(?:k|thousand|K)",
-        r"budget\s+(?:of\s+)?\$?(\d+(?:,\d{3})*)\s*(?:k|thousand|K)?",
-        r"\$(\d+(?:,\d{3})*)",
-    ]
+    budget_patterns = _BUDGET_PATTERNS if _DIGIT_RE.search(text) else ()
     for pattern in budget_patterns:
-        match = re.search(pattern, text, re.IGNORECASE)
+        match = pattern.search(text)
         if match:
-            budget_str = match.group(1).replace(",", "")
-            try:
-                budget_val = float(budget_str)
+            budget_val = parse_budget(match.group(1))
+            if budget_val is not None:
                 if "k" in match.group(0).lower() or "thousand" in match.group(0).lower():
                     budget_val *= 1000
                 extracted["budget"] = int(budget_val)
                 break
-            except:
-                pass
     
     return extracted
 
 
-def check_missing_fields(data: Dict) -> List[str]:
+# Presence bit per required field, in REQUIRED_FIELDS order
+_REQUIRED_BITS = tuple((field, 1 << i) for i, field in enumerate(REQUIRED_FIELDS))
+ALL_REQUIRED_MASK = (1 << len(REQUIRED_FIELDS)) - 1
+
+# Follow-up question per required field, in REQUIRED_FIELDS order
+_QUESTIONS = (
+    "What is the name of the client or company for this proposal?",
+    "What type of deal or service are we proposing? (e.g., Software, Consulting, Implementation)",
+    "What is the budget or investment amount for this project?",
+    "What is the timeline or deadline for this project?",
+)
+
+
+def check_missing_mask(data: ProposalRecord) -> int:
+    """Bitmask of required fields that are still empty (bit i is REQUIRED_FIELDS[i])."""
+    present = 0
+    for field, bit in _REQUIRED_BITS:
+        if getattr(data, field):
+            present |= bit
+    return ALL_REQUIRED_MASK & ~present
+
+
+def check_missing_fields(data: ProposalRecord) -> List[str]:
     """Check which required fields are missing."""
-    required = ["client_name", "deal_type", "budget", "timeline"]
-    missing = [field for field in required if not data.get(field)]
-    return missing
+    return missing_fields_from_mask(check_missing_mask(data))
+
+
+def missing_fields_from_mask(missing_mask: int) -> List[str]:
+    return [field for field, bit in _REQUIRED_BITS if missing_mask & bit]
 
 
-def generate_question(missing_fields: List[str], data: Dict) -> str:
-    """Generate a question for missing fields."""
-    if not missing_fields:
+def generate_question(missing_mask: int) -> str:
+    """Generate a question for the first missing field."""
+    if not missing_mask:
         return "I have all the info. Should I generate the draft?"
     
-    field = missing_fields[0]
-    question_map = {
-        "client_name": "What is the name of the client or company for this proposal?",
-        "deal_type": "What type of deal or service are we proposing? (e.g., Software, Consulting, Implementation)",
-        "budget": "What is the budget or investment amount for this project?",
-        "timeline": "What is the timeline or deadline for this project?",
-    }
-    
-    return question_map.get(field, f"What is the {field.replace('_', ' ')}?")
+    # Index of the lowest set bit
+    return _QUESTIONS[(missing_mask & -missing_mask).bit_length() - 1]
+
+
+# One lock per thread id that is currently being processed; entries vanish once unused
+_proposal_locks: "weakref.WeakValueDictionary[str, asyncio.Lock]" = weakref.WeakValueDictionary()
 
 
-def process_proposal(thread_id: str, user_input: str) -> Dict:
+async def process_proposal(thread_id: str, user_input: str) -> ProposalRecord:
     """Process a proposal request using CrewAI."""
+    # Turns on the same proposal run one at a time so their writes don't interleave across awaits
+    lock = _proposal_locks.setdefault(thread_id, asyncio.Lock())
+    async with lock:
+        return await _process_proposal(thread_id, user_input)
+
+
+async def _process_proposal(thread_id: str, user_input: str) -> ProposalRecord:
     # Get or create proposal state
     if thread_id not in proposals_store:
-        proposals_store[thread_id] = {
-            "user_request": user_input,
-            "audit_log": [f"Proposal started with request: {user_input}"],
-            "current_step": "collecting_info",
-            "missing_fields": [],
-            "current_question": None,
-            "budget": None,
-            "client_name": None,
-            "deal_type": None,
-            "timeline": None,
-            "proposal_title": None,
-            "problem_statement": None,
-            "solution_overview": None,
-            "architecture_approach": None,
-            "pricing_details": None,
-            "compliance_info": None,
-            "terms_conditions": None,
-            "conclusion": None,
-            "uploaded_images": [],
-            "crm_data": None,
-            "pricing": None,
-            "compliance_status": None,
-            "draft_v1": None,
-            "draft_v2": None,
-            "final_draft": None,
-            "approval_status": None,
-            "approval_comments": None,
-            "proposed_margin": None,
-            "proposed_base_cost": None,
-            "compliance_issues": None,
-        }
+        record = ProposalRecord(user_request=user_input)
+        record.audit_log.append((AUDIT_STARTED, user_input))
+        proposals_store[thread_id] = record
     
     state = proposals_store[thread_id]
     
     # Extract information from user input
-    existing_data = {
-        "client_name": state.get("client_name"),
-        "deal_type": state.get("deal_type"),
-        "budget": state.get("budget"),
-        "timeline": state.get("timeline"),
-    }
+    existing_data = {key: getattr(state, key) for key in REQUIRED_FIELDS}
     
-    extracted = extract_info_from_text(user_input, existing_data)
+    extracted = await extract_info_from_text(user_input, existing_data)
     
     # Update state with extracted data
-    for key in ["client_name", "deal_type", "budget", "timeline"]:
-        if extracted.get(key):
-            state[key] = extracted[key]
+    for key in REQUIRED_FIELDS:
+        value = extracted.get(key)
+        if value:
+            setattr(state, key, value)
     
-    state["audit_log"].append(f"Processed user input: {user_input[:100]}...")
+    state.audit_log.append((AUDIT_PROCESSED, user_input[:100]))
     
     # Check for missing fields
-    missing = check_missing_fields(state)
-    state["missing_fields"] = missing
+    missing_mask = check_missing_mask(state)
+    state.missing_fields = missing_fields_from_mask(missing_mask)
     
     # If we have client_name, fetch CRM data
-    if state.get("client_name") and not state.get("crm_data"):
-        client_name = state["client_name"]
-        state["crm_data"] = MockCRM.get_client_data(client_name)
-        state["audit_log"].append(f"Fetched CRM data for {client_name}")
+    if state.client_name and not state.crm_data:
+        client_name = state.client_name
+        state.crm_data = await MockCRM.get_client_data(client_name)
+        state.audit_log.append((AUDIT_CRM_FETCHED, client_name))
     
     # Determine next step
-    if missing:
+    if missing_mask:
         # Still missing info - ask user
-        state["current_step"] = "ask_user"
-        state["current_question"] = generate_question(missing, state)
-        state["audit_log"].append(f"Asked user: {state['current_question']}")
+        state.current_step = "ask_user"
+        state.current_question = generate_question(missing_mask)
+        state.audit_log.append((AUDIT_ASKED_USER, state.current_question))
     else:
         # All info collected - generate draft
         try:
-            state["current_step"] = "generating_draft"
+            state.current_step = "generating_draft"
             draft = generate_draft(state)
-            state["draft_v1"] = draft
-            
-            # Run pricing and compliance
-            state["current_step"] = "pricing_review"
-            pricing_result = MockPricingEngine.calculate_pricing(
-                state.get("deal_type", "Standard"),
-                state.get("budget", 0),
-                state.get("crm_data", {})
-            )
-            state["pricing"] = pricing_result
-            state["proposed_margin"] = pricing_result.get("margin")
-            state["proposed_base_cost"] = pricing_result.get("base_cost")
+            # An unchanged draft keeps its earlier compliance result
+            draft_unchanged = draft == state.draft_v1 and state.compliance_status is not None
+            state.draft_v1 = draft
             
-            compliance_result = MockComplianceEngine.check_compliance(
-                draft,
-                state.get("deal_type", "")
+            # Run pricing and compliance (independent of each other) concurrently
+            state.current_step = "pricing_review"
+            pricing = MockPricingEngine.calculate_pricing(
+                state.deal_type or "Standard",
+                state.budget or 0,
+                state.crm_data or {}
             )
-            state["compliance_status"] = compliance_result
-            state["compliance_issues"] = compliance_result.get("issues", [])
+            if draft_unchanged:
+                pricing_result = await pricing
+                compliance_result = state.compliance_status
+            else:
+                pricing_result, compliance_result = await asyncio.gather(
+                    pricing,
+                    MockComplianceEngine.check_compliance(
+                        draft,
+                        state.deal_type or ""
+                    ),
+                )
+            state.pricing = pricing_result
+            state.proposed_margin = pricing_result.get("margin")
+            state.proposed_base_cost = pricing_result.get("base_cost")
+            state.compliance_status = compliance_result
+            state.compliance_issues = compliance_result.get("issues", [])
             
-            state["current_step"] = "wait_for_approval"
-            state["approval_status"] = "pricing_review"
-            state["audit_log"].append("Submitted for Admin Review (Pricing, Margin, Compliance Approval)")
+            state.current_step = "wait_for_approval"
+            state.approval_status = "pricing_review"
+            state.audit_log.append((AUDIT_SUBMITTED, ""))
         except Exception as e:
             logger.error(f"Error generating draft: {str(e)}")
-            state["current_step"] = "error"
-            state["audit_log"].append(f"Error during draft generation: {str(e)}")
-            state["current_question"] = "I encountered an error while generating the proposal. Please try again or contact support."
+            state.current_step = "error"
+            state.audit_log.append((AUDIT_DRAFT_ERROR, str(e)))
+            state.current_question = "I encountered an error while generating the proposal. Please try again or contact support."
     
+    state.touch()
     return state
 
 
-def generate_draft(state: Dict) -> str:
-    """Generate proposal draft."""
-    client = state.get("client_name", "Client")
-    deal_type = state.get("deal_type", "Service")
-    budget = state.get("budget", 0)
-    timeline = state.get("timeline", "ASAP")
-    industry = state.get("crm_data", {}).get("industry", "Business")
-    
-    # Ensure all fields have default values (handle None)
-    proposal_title = state.get("proposal_title") or f"Proposal for {client}"
-    problem_statement = state.get("problem_statement") or "Addressing client business needs"
-    solution_overview = state.get("solution_overview") or "Comprehensive solution approach"
-    architecture_approach = state.get("architecture_approach") or "Technical implementation strategy"
-    pricing_details = state.get("pricing_details") or f"Total investment: ${budget:,.2f}"
-    compliance_info = state.get("compliance_info") or "Standard compliance requirements"
-    terms_conditions = state.get("terms_conditions") or "Standard terms and conditions"
-    conclusion = state.get("conclusion") or "Next steps and call to action"
-    
-    draft = f"""# {proposal_title.upper()}
+# Proposal draft layout, parsed once at import
+DRAFT_TEMPLATE = string.Template("""# ${title}
 
 ## Executive Summary
-We are pleased to present this comprehensive proposal for {client}, a leading {industry} organization. This document outlines our strategic approach to addressing your specific needs through our {deal_type} solution, designed to deliver exceptional value within your {timeline} timeline.
+We are pleased to present this comprehensive proposal for ${client}, a leading ${industry} organization. This document outlines our strategic approach to addressing your specific needs through our ${deal_type} solution, designed to deliver exceptional value within your ${timeline} timeline.
 
 **Proposal Validity**: This proposal is valid for 30 days from submission
-**Target Timeline**: {timeline}
-**Industry Focus**: {industry}
+**Target Timeline**: ${timeline}
+**Industry Focus**: ${industry}
 
 ## Problem Statement
-{problem_statement}
+${problem_statement}
 
 ## Solution Overview
-{solution_overview}
+${solution_overview}
 
 ## Architecture & Approach
-{architecture_approach}
+${architecture_approach}
 
 ## Timeline & Implementation
-**Project Timeline**: {timeline}
+**Project Timeline**: ${timeline}
 **Implementation Strategy**: Phased approach with regular milestones
 **Key Deliverables**: Complete solution deployment and training
 
 ## Pricing & Investment
-{pricing_details}
+${pricing_details}
 
 **Payment Terms**: Net 30 (standard)
 **Included Services**: Implementation, training, and 12-month support
 
 ## Compliance & Requirements
-{compliance_info}
+${compliance_info}
 
 ## Terms & Conditions
-{terms_conditions}
+${terms_conditions}
 
 ## Conclusion
-{conclusion}
+${conclusion}
 
 ---
 **Next Steps**: Upon approval, we will schedule a kickoff meeting within 5 business days to begin the implementation process.
 
 **Note**: This proposal requires internal review and approval before finalization. All terms are subject to standard governance procedures.
-    """
-    
-    return draft
+    """)
 
 
-def finalize_proposal(thread_id: str, approval_comments: str = "") -> Dict:
+def generate_draft(state: ProposalRecord) -> str:
+    """Generate proposal draft."""
+    client = state.client_name or "Client"
+    budget = state.budget or 0
+    
+    # Ensure all fields have default values (handle None)
+    return DRAFT_TEMPLATE.substitute(
+        title=(state.proposal_title or f"Proposal for {client}").upper(),
+        client=client,
+        industry=(state.crm_data or {}).get("industry", "Business"),
+        deal_type=state.deal_type or "Service",
+        timeline=state.timeline or "ASAP",
+        problem_statement=state.problem_statement or "Addressing client business needs",
+        solution_overview=state.solution_overview or "Comprehensive solution approach",
+        architecture_approach=state.architecture_approach or "Technical implementation strategy",
+        pricing_details=state.pricing_details or f"Total investment: ${budget:,.2f}",
+        compliance_info=state.compliance_info or "Standard compliance requirements",
+        terms_conditions=state.terms_conditions or "Standard terms and conditions",
+        conclusion=state.conclusion or "Next steps and call to action",
+    )
+
+
+def finalize_proposal(thread_id: str, approval_comments: str = "") -> ProposalRecord:
     """Finalize proposal after admin approval."""
     if thread_id not in proposals_store:
         raise ValueError(f"Proposal {thread_id} not found")
     
     state = proposals_store[thread_id]
     
+    # A repeated approval with the same comments would rebuild the same draft
+    if state.approval_status == "finalized" and state.approval_comments == approval_comments:
+        return state
+    
     # Add approval comments to draft
-    original_draft = state.get("draft_v1", "")
+    original_draft = state.draft_v1 or ""
     revised_draft = original_draft + f"\n\n## Admin Review & Approval Notes\n{approval_comments}\n**Status**: Approved for finalization."
     
-    state["draft_v2"] = revised_draft
-    state["final_draft"] = revised_draft
-    state["approval_status"] = "finalized"
-    state["current_step"] = "finalized"
-    state["approval_comments"] = approval_comments
-    state["audit_log"].append("Proposal Finalized and Ready to Send.")
+    state.draft_v2 = revised_draft
+    state.final_draft = revised_draft
+    state.approval_status = "finalized"
+    state.current_step = "finalized"
+    state.approval_comments = approval_comments
+    state.audit_log.append((AUDIT_FINALIZED, ""))
+    state.touch()
     
     return state
@@ -1,22 +1,50 @@
+import asyncio
+import hashlib
 import logging
 import os
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
-from typing import Dict, List, Optional
-from fastapi import FastAPI, HTTPException
+from typing import Any, Optional
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
 from pydantic import BaseModel
-import uuid
+import secrets
+import time
+import orjson
+from dataclasses import asdict
 
 # Load environment variables from .env file
 load_dotenv()
 
-from .crew_system import process_proposal, finalize_proposal, proposals_store
+from .crew_system import (
+    process_proposal,
+    finalize_proposal,
+    proposals_store,
+    groq_http_client,
+    warm_up_llm,
+)
+from .state import ProposalMeta, ProposalRecord, AUDIT_REJECTED, image_from_upload, render_audit_log
+from .store import ProposalIndex
+from .mocks import clear_caches
 
 # Logging
-logging.basicConfig(level=logging.INFO)
+logging.basicConfig(level=os.getenv("LOG_LEVEL", "INFO").upper())
 logger = logging.getLogger(__name__)
 
-app = FastAPI(title="Northstar Proposal Agent API")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Warm the Groq connection in the background so a slow or unreachable Groq doesn't hold up startup
+    warm_up = asyncio.create_task(warm_up_llm())
+    yield
+    warm_up.cancel()
+    await groq_http_client.aclose()
+
+
+app = FastAPI(
+    title="Northstar Proposal Agent API",
+    lifespan=lifespan,
+)
 
 @app.get("/health")
 async def health_check():
@@ -33,8 +61,9 @@ app.add_middleware(
 )
 
 # Simple in-memory index for Admin UI
-# Format: {thread_id: {client_name, status, last_updated}}
-proposals_index: Dict[str, Dict] = {}
+proposals_index = ProposalIndex()
+# Evicted proposals disappear from the admin UI too
+proposals_store.on_evict = proposals_index.delete
 
 
 class CreateProposalRequest(BaseModel):
@@ -42,8 +71,10 @@ class CreateProposalRequest(BaseModel):
 
 
 class UpdateProposalRequest(BaseModel):
-    # For providing missing info
-    additional_info: Optional[Dict] = None
+    # For providing missing info. Typed as Any so pydantic passes the decoded
+    # JSON object through instead of re-validating (and copying) every key;
+    # the handler checks its shape.
+    additional_info: Any = None
 
 
 class AdminActionRequest(BaseModel):
@@ -54,38 +85,59 @@ class AdminActionRequest(BaseModel):
 @app.post("/api/proposals/create")
 async def create_proposal(req: CreateProposalRequest):
     """Create a new proposal."""
-    thread_id = str(uuid.uuid4())
+    thread_id = secrets.token_hex(16)
     
     # Process the initial request
-    state = process_proposal(thread_id, req.user_request)
+    state = await process_proposal(thread_id, req.user_request)
     
     # Update Index
-    proposals_index[thread_id] = {
-        "client_name": state.get("client_name", "Unknown"),
-        "status": state.get("current_step", "unknown"),
-        "approval_status": state.get("approval_status", "none"),
-        "timestamp": 0  # TODO: real timestamp
-    }
+    proposals_index.upsert(thread_id, ProposalMeta(
+        client_name=state.client_name,
+        status=state.current_step,
+        approval_status=state.approval_status,
+        timestamp=time.time(),
+    ))
     
     return {
         "id": thread_id,
-        "state": state,
-        "status": state.get("current_step"),
-        "question": state.get("current_question")  # If asking user
+        "state": state.to_dict(),
+        "status": state.current_step,
+        "question": state.current_question  # If asking user
     }
 
 
+def _state_etag(state: ProposalRecord) -> str:
+    """Strong ETag for the proposal state, cached on the record until it next changes."""
+    if state.etag is None:
+        digest = hashlib.blake2b(
+            orjson.dumps(state.to_dict(), option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS),
+            digest_size=16,
+        )
+        # Hash image bytes directly rather than base64-encoding them
+        for image in state.uploaded_images:
+            digest.update(image["data"])
+        state.etag = f'"{digest.hexdigest()}"'
+    return state.etag
+
+
 @app.get("/api/proposals/{thread_id}")
-async def get_proposal(thread_id: str):
-    """Get proposal state."""
+async def get_proposal(thread_id: str, request: Request, response: Response, include: str = ""):
+    """Get proposal state. Pass include=images to also return uploaded image data."""
     if thread_id not in proposals_store:
         raise HTTPException(status_code=404, detail="Proposal not found")
     
     state = proposals_store[thread_id]
     
+    # Repeated polls of an unchanged proposal skip serialization entirely
+    etag = _state_etag(state)
+    headers = {"ETag": etag, "Cache-Control": "private, max-age=1"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    response.headers.update(headers)
     return {
         "id": thread_id,
-        "state": state,
+        "state": state.to_dict(include_images="images" in include.split(",")),
         "next": []  # Simple function-based workflow doesn't have next steps
     }
 
@@ -98,6 +150,8 @@ async def continue_proposal(thread_id: str, req: UpdateProposalRequest):
     
     if not req.additional_info:
         raise HTTPException(status_code=400, detail="additional_info is required")
+    if not isinstance(req.additional_info, dict):
+        raise HTTPException(status_code=400, detail="additional_info must be an object")
     
     # Get the user's response
     user_response = req.additional_info.get("response", "")
@@ -108,40 +162,40 @@ async def continue_proposal(thread_id: str, req: UpdateProposalRequest):
     # Handle image uploads
     state = proposals_store[thread_id]
     if "image_base64" in req.additional_info and "image_note" in req.additional_info:
-        image_data = {
-            "base64": req.additional_info["image_base64"],
-            "description": req.additional_info["image_note"],
-            "section": "general"
-        }
-        state["uploaded_images"] = state.get("uploaded_images", []) + [image_data]
+        try:
+            image_data = image_from_upload(req.additional_info["image_base64"], req.additional_info["image_note"])
+        except ValueError:
+            raise HTTPException(status_code=400, detail="image_base64 is not valid base64")
+        state.uploaded_images.append(image_data)
+        state.touch()
     
     # Process the user's response
-    state = process_proposal(thread_id, user_response)
+    state = await process_proposal(thread_id, user_response)
     
     # Update Index
-    if thread_id in proposals_index:
-        proposals_index[thread_id].update({
-            "client_name": state.get("client_name", "Unknown"),
-            "status": state.get("current_step", "unknown"),
-            "approval_status": state.get("approval_status", "none")
-        })
+    proposals_index.update(
+        thread_id,
+        client_name=state.client_name,
+        status=state.current_step,
+        approval_status=state.approval_status,
+        timestamp=time.time(),
+    )
     
     return {
         "id": thread_id,
-        "state": state,
-        "status": state.get("current_step"),
-        "question": state.get("current_question")  # Next question if still asking
+        "state": state.to_dict(),
+        "status": state.current_step,
+        "question": state.current_question  # Next question if still asking
     }
 
 
 @app.get("/api/admin/pending")
 async def get_pending_approvals():
     """Returns proposals waiting for approval."""
-    pending = []
-    for tid, meta in proposals_index.items():
-        if meta.get("status") == "wait_for_approval":
-            pending.append({"id": tid, **meta})
-    return pending
+    return [
+        {"id": tid, **asdict(meta)}
+        for tid, meta in proposals_index.with_status("wait_for_approval")
+    ]
 
 
 @app.post("/api/admin/{thread_id}/action")
@@ -157,56 +211,95 @@ async def admin_action(thread_id: str, req: AdminActionRequest):
         state = finalize_proposal(thread_id, req.comments)
     else:
         # Reject - update status
-        state["approval_status"] = "rejected"
-        state["approval_comments"] = req.comments
-        state["audit_log"].append(f"Admin REJECTED: {req.comments}")
+        state.approval_status = "rejected"
+        state.approval_comments = req.comments
+        state.audit_log.append((AUDIT_REJECTED, req.comments))
+        state.touch()
     
     # Update Index
-    proposals_index[thread_id].update({
-        "status": state.get("current_step", "unknown"),
-        "approval_status": state.get("approval_status")
-    })
+    proposals_index.update(
+        thread_id,
+        status=state.current_step,
+        approval_status=state.approval_status,
+        timestamp=time.time(),
+    )
     
     return {
         "status": "success",
-        "state": state,
-        "approval_status": state.get("approval_status")
+        "state": state.to_dict(),
+        "approval_status": state.approval_status
     }
 
 
+@app.post("/api/admin/cache/clear")
+async def clear_cache():
+    """Drop memoized CRM, pricing and compliance results."""
+    clear_caches()
+    return {"status": "success"}
+
+
 @app.get("/api/proposals/{thread_id}/finalized")
-async def get_finalized_proposal(thread_id: str):
-    """Returns the finalized sales proposal for display."""
+async def get_finalized_proposal(thread_id: str, request: Request, response: Response):
+    """Returns the finalized sales proposal for display, or just its markdown for Accept: text/markdown."""
     if thread_id not in proposals_store:
         raise HTTPException(status_code=404, detail="Proposal not found")
     
     state = proposals_store[thread_id]
     
     # Check if proposal is finalized
-    if state.get("approval_status") != "finalized":
+    if state.approval_status != "finalized":
         raise HTTPException(status_code=400, detail="Proposal not finalized yet")
     
     # Validate that we have the required data
-    final_draft = state.get("final_draft") or state.get("draft_v2") or state.get("draft_v1")
+    final_draft = state.final_draft or state.draft_v2 or state.draft_v1
     if not final_draft:
         raise HTTPException(status_code=500, detail="Finalized proposal content not found")
     
+    # Approving again with new comments, rejecting or continuing changes the proposal,
+    # so clients revalidate every time and rely on the ETag for a cheap 304
+    as_markdown = "text/markdown" in request.headers.get("accept", "")
+    etag = _state_etag(state)
+    if as_markdown:
+        etag = etag[:-1] + '-md"'
+    headers = {
+        "ETag": etag,
+        "Cache-Control": "private, no-cache",
+        "Vary": "Accept",
+    }
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    if as_markdown:
+        return Response(final_draft, media_type="text/markdown", headers=headers)
+    
+    audit_log = render_audit_log(state.audit_log)
+    
     # Return the finalized proposal data
+    response.headers.update(headers)
     return {
         "id": thread_id,
         "status": "finalized",
         "proposal": final_draft,
-        "client_name": state.get("client_name", "Unknown"),
-        "deal_type": state.get("deal_type", "Unknown"),
-        "budget": state.get("budget", 0),
-        "timeline": state.get("timeline", "Unknown"),
-        "pricing": state.get("pricing", {}),
-        "compliance_status": state.get("compliance_status", "approved"),
-        "audit_log": state.get("audit_log", []),
-        "finalized_timestamp": state.get("audit_log", [])[-1] if state.get("audit_log") else None
+        "client_name": state.client_name,
+        "deal_type": state.deal_type,
+        "budget": state.budget,
+        "timeline": state.timeline,
+        "pricing": state.pricing,
+        "compliance_status": state.compliance_status,
+        "audit_log": audit_log,
+        "finalized_timestamp": audit_log[-1] if audit_log else None
     }
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Proposals live in this process's memory, so keep a single worker unless
+    # the store is externalized; WEB_CONCURRENCY is the same knob the uvicorn CLI reads.
+    uvicorn.run(
+        "app.main:app",
+        host="0.0.0.0",
+        port=8000,
+        loop="uvloop",
+        http="httptools",
+        workers=int(os.getenv("WEB_CONCURRENCY", "1")),
+    )
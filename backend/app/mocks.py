@@ -1,57 +1,102 @@
+import asyncio
+import hashlib
 import random
+import re
 import time
+import zlib
+from types import MappingProxyType
+
+from .cache import async_lru_cache
+
+
+@async_lru_cache(maxsize=1024)
+async def _cached_client_data(client_name: str) -> MappingProxyType:
+    await asyncio.sleep(0.5)
+    
+    # Seed from the name so a client gets the same record across cache evictions and restarts
+    rng = random.Random(zlib.crc32(client_name.encode()))
+    industry = "Technology" if len(client_name) % 2 == 0 else "Healthcare"
+    return MappingProxyType({
+        "client_id": f"CL-{rng.randint(1000, 9999)}",
+        "name": client_name,
+        "industry": industry,
+        "annual_revenue": rng.randint(1, 100) * 1000000,
+        "trust_score": rng.randint(80, 100),
+        "previous_deals": rng.randint(0, 5)
+    })
+
+
+@async_lru_cache(maxsize=512)
+async def _cached_pricing(deal_type: str, budget: float, trust_score: int) -> MappingProxyType:
+    await asyncio.sleep(0.5)
+    
+    base_cost = budget * 0.8  # Assume 20% margin target
+    discount_allowed = 0.10
+    
+    if trust_score > 90:
+        discount_allowed = 0.15
+        
+    return MappingProxyType({
+        "base_cost": base_cost,
+        "suggested_price": budget,
+        "margin": (budget - base_cost) / budget,
+        "max_discount": discount_allowed,
+        "currency": "USD"
+    })
+
+
+# One pass over the draft; the matching group name identifies the issue
+_FORBIDDEN_RE = re.compile(r"\b(?P<guarantee>guarantee)|(?P<unlimited>unlimited)\b", re.IGNORECASE)
+_FORBIDDEN_ISSUES = {
+    "guarantee": "Avoid using the word 'guarantee' without legal approval.",
+    "unlimited": "Unlimited liability must be capped.",
+}
+
+
+def _compliance_key(draft_content: str, deal_type: str) -> tuple:
+    return (hashlib.blake2b(draft_content.encode(), digest_size=16).digest(), deal_type)
+
+
+# Re-checks of an unchanged draft (e.g. across approval cycles) hit the cache;
+# keyed on a digest so the cache never holds whole drafts
+@async_lru_cache(maxsize=4096, key=_compliance_key)
+async def _cached_compliance(draft_content: str, deal_type: str) -> MappingProxyType:
+    await asyncio.sleep(0.5)
+    
+    found = {match.lastgroup for match in _FORBIDDEN_RE.finditer(draft_content)}
+    # Report in a fixed order regardless of where the terms appear
+    issues = tuple(message for term, message in _FORBIDDEN_ISSUES.items() if term in found)
+    return MappingProxyType({
+        "passed": not issues,
+        "issues": issues,
+        "checked_at": time.time()
+    })
+
+
+def clear_caches() -> None:
+    """Drop all memoized mock results."""
+    _cached_client_data.cache_clear()
+    _cached_pricing.cache_clear()
+    _cached_compliance.cache_clear()
+
 
 class MockCRM:
     @staticmethod
-    def get_client_data(client_name: str) -> dict:
+    async def get_client_data(client_name: str) -> dict:
         """Simulates fetching client data from a CRM."""
-        time.sleep(0.5)
-        
-        industry = "Technology" if len(client_name) % 2 == 0 else "Healthcare"
-        return {
-            "client_id": f"CL-{random.randint(1000, 9999)}",
-            "name": client_name,
-            "industry": industry,
-            "annual_revenue": random.randint(1, 100) * 1000000,
-            "trust_score": random.randint(80, 100),
-            "previous_deals": random.randint(0, 5)
-        }
+        # Cached entries are read-only; hand each caller its own copy
+        return dict(await _cached_client_data(client_name))
 
 class MockPricingEngine:
     @staticmethod
-    def calculate_pricing(deal_type: str, budget: float, client_data: dict) -> dict:
+    async def calculate_pricing(deal_type: str, budget: float, client_data: dict) -> dict:
         """Simulates a pricing calculation engine."""
-        time.sleep(0.5)
-        
-        base_cost = budget * 0.8  # Assume 20% margin target
-        discount_allowed = 0.10
-        
-        if client_data.get("trust_score", 0) > 90:
-            discount_allowed = 0.15
-            
-        return {
-            "base_cost": base_cost,
-            "suggested_price": budget,
-            "margin": (budget - base_cost) / budget,
-            "max_discount": discount_allowed,
-            "currency": "USD"
-        }
+        # Only the trust score affects the quote, so it is the cache key rather than the whole record
+        return dict(await _cached_pricing(deal_type, budget, client_data.get("trust_score", 0)))
 
 class MockComplianceEngine:
     @staticmethod
-    def check_compliance(draft_content: str, deal_type: str) -> dict:
+    async def check_compliance(draft_content: str, deal_type: str) -> dict:
         """Simulates a compliance check on the proposal content."""
-        time.sleep(0.5)
-        
-        issues = []
-        if "guarantee" in draft_content.lower():
-            issues.append("Avoid using the word 'guarantee' without legal approval.")
-        if "unlimited" in draft_content.lower():
-            issues.append("Unlimited liability must be capped.")
-            
-        passed = len(issues) == 0
-        return {
-            "passed": passed,
-            "issues": issues,
-            "checked_at": time.time()
-        }
+        result = await _cached_compliance(draft_content, deal_type)
+        return {**result, "issues": list(result["issues"])}
@@ -1,163 +1,270 @@
 
 import os
-import json
+import asyncio
+import logging
+import re
 from typing import Dict, Any, Optional, List
-from langchain_groq import ChatGroq
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
-from .state import ProposalState
+from langchain_core.messages import HumanMessage, SystemMessage
+from .cache import LRUCache
+from .state import ProposalState, image_from_upload
 from .mocks import MockCRM, MockPricingEngine, MockComplianceEngine
+from .parsing import parse_extraction
+from .crew_system import (
+    ALL_REQUIRED_MASK,
+    DRAFT_TEMPLATE,
+    REQUIRED_FIELDS,
+    is_low_signal,
+    llm,
+    missing_fields_from_mask,
+)
 
-# Initialize LLM
-llm = ChatGroq(model_name="llama-3.1-8b-instant", temperature=0.7)
+logger = logging.getLogger(__name__)
+
+# Short classification/question calls run on the fast model shared with crew_system; no node
+# here generates long-form prose (generate_draft is a template fill), so no larger tier is needed
+llm_fast = llm
+
+# Caps in-flight Groq calls from the nodes (extraction and questions) so bursts stay under the rate limit
+_llm_semaphore = asyncio.Semaphore(int(os.getenv("GROQ_MAX_CONCURRENCY", "8")))
+
+# LLM-generated questions keyed on the full set of ask_user prompt variables
+QUESTION_CACHE_SIZE = 512
+_question_cache = LRUCache(QUESTION_CACHE_SIZE)
+
+# Proposal sections collect_intent reads from the extraction JSON, after REQUIRED_FIELDS
+_SECTION_FIELDS = ("proposal_title", "problem_statement", "solution_overview", "architecture_approach",
+                   "pricing_details", "compliance_info", "terms_conditions", "conclusion")
+_EXTRACTED_FIELDS = REQUIRED_FIELDS + _SECTION_FIELDS
+# Keys of the combined extraction + next-question response
+_RESPONSE_FIELDS = _EXTRACTED_FIELDS + ("next_question",)
+
+
+# Extraction instructions for collect_intent; static so every call shares the same prompt prefix
+COLLECT_INTENT_SYSTEM_MESSAGE = SystemMessage(content="""You are a smart sales assistant analyzing a proposal request. Extract the following information from the user's message:
+
+Basic Info:
+- client_name: Name of the company/client
+- deal_type: Type of deal (e.g. Software, Consulting, Implementation)
+- budget: Budget amount (number)
+- timeline: Timeline (e.g. Q1, ASAP, 3 months)
+
+Proposal Sections (extract if mentioned):
+- proposal_title: Title of the proposal
+- problem_statement: Problem being solved
+- solution_overview: High-level solution description
+- architecture_approach: Technical architecture or approach
+- pricing_details: Pricing information
+- compliance_info: Compliance requirements
+- terms_conditions: Terms and conditions
+- conclusion: Conclusion or next steps
+
+Also write next_question: a short, friendly question (as 'Northstar', the sales agent) asking for the first field
+in the order listed above that is neither already known nor found in this message. Use null if nothing is missing.
+
+Reply with one line per field you found, written exactly as "field_name: value", for example:
+client_name: Acme Corp
+budget: 50000
+next_question: What timeline are you working towards?
+Leave out fields that are not mentioned. Keep each value on a single line. Do not add any other text.
+""")
+
+
+# Enhanced prompt for comprehensive proposal sections. The system message is fully static so
+# Groq can reuse its cached prefix across proposals; per-proposal details go in a short human
+# message. State values are template variables, so braces in user text are passed through as-is.
+ASK_USER_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", """You are 'Northstar', an intelligent and friendly sales agent.
+
+Your Goal:
+1. If the user provided new info, acknowledge it briefly
+2. Ask for the NEXT missing piece of information (the first one listed under Missing Information)
+3. Be conversational and specific
+4. For proposal sections, ask detailed questions
+5. Mention they can upload images if relevant
+6. Keep it concise but engaging
+
+Question Examples:
+- For proposal_title: "What would you like to title this proposal?"
+- For problem_statement: "What specific problem are we solving for the client?"
+- For solution_overview: "Can you describe the high-level solution approach?"
+- For architecture_approach: "What's the technical architecture or methodology we'll use?"
+- For pricing_details: "How should we structure the pricing breakdown?"
+- For compliance_info: "Are there any specific compliance requirements?"
+- For terms_conditions: "What terms and conditions should we include?"
+- For conclusion: "What should be the main takeaway or call to action?"
+
+Reply with only the message to send to the user.
+"""),
+    ("human", "Current Information: Client: {client_name} | Deal Type: {deal_type} | Budget: {budget} | Timeline: {timeline}\n"
+              "Missing Information: {missing}\n"
+              'The user just said: "{user_request}"'),
+])
+# Built once; each call only fills in the variables
+ASK_USER_CHAIN = ASK_USER_PROMPT | llm_fast | StrOutputParser()
+
+# Whole-word approval phrases in a review reply ("yesterday" is not a "yes")
+APPROVAL_RE = re.compile(r"\b(?:approved?|proceed|looks good|yes)\b", re.IGNORECASE)
+
+# Fallback question per missing field when the LLM is unavailable
+QUESTION_MAP = {
+    "client_name": "Who is the client for this proposal?",
+    "deal_type": "What kind of deal or service are we proposing?",
+    "budget": "Do you have a specific budget in mind?",
+    "timeline": "When are you looking to start this project?",
+    "proposal_title": "What would you like to title this proposal?",
+    "problem_statement": "What specific problem are we solving for the client?",
+    "solution_overview": "Can you describe the high-level solution approach?",
+    "architecture_approach": "What's the technical architecture or methodology we'll use?",
+    "pricing_details": "How should we structure the pricing breakdown?",
+    "compliance_info": "Are there any specific compliance requirements we need to address?",
+    "terms_conditions": "What terms and conditions should we include?",
+    "conclusion": "What should be the main takeaway or call to action?"
+}
+
+# Resume target per current_step; any other step starts at collect_intent
+_START_ROUTES = {
+    # Resume to handle feedback
+    "review_proposal": "handle_feedback",
+}
 
 def route_start(state: ProposalState):
     """Entry router to decide where to go based on current step."""
-    step = state.get("current_step")
-    if step == "collect_intent" or step == "check_missing_info" or step == "ask_user":
-        # Resume asking questions/collecting intent
-        return "collect_intent"
-    elif step == "review_proposal":
-        # Resume to handle feedback
-        return "handle_feedback"
-    else:
-        # Default start
-        return "collect_intent"
+    return _START_ROUTES.get(state.get("current_step"), "collect_intent")
+
+
+async def _extract_intent(messages: List) -> Dict:
+    """Run the extraction prompt; an empty result lets collect_intent rely on existing state."""
+    try:
+        async with _llm_semaphore:
+            response = (await llm_fast.ainvoke(messages)).content
+        logger.debug("LLM Response (Extraction): %s", response)
+        
+        extracted = parse_extraction(response, _RESPONSE_FIELDS)
+        logger.debug("Extracted JSON: %s", extracted)
+        return extracted
+    except Exception as e:
+        logger.error("LLM Extraction failed: %s", e)
+        return {}
 
 
-def collect_intent(state: ProposalState) -> Dict:
+async def collect_intent(state: ProposalState) -> Dict:
     """Analyzes the user request to extract intent and comprehensive proposal information."""
-    print(f"--- Node: collect_intent ---")
+    logger.debug("Node: collect_intent")
     user_request = state.get("user_request", "")
     
+    # "ok", "yes", a blank message... nothing an extraction call could pick up. Short
+    # replies are otherwise kept: they may be answers to proposal-section questions.
+    if "image_base64" not in state and is_low_signal(user_request):
+        return {
+            "current_step": "check_missing_info",
+            "suggested_question": None,
+            "audit_log": [f"Skipped extraction for low-signal reply: {user_request[:100]}"]
+        }
+    
     # DEBUG: Check if API Key works
     if not os.environ.get("GROQ_API_KEY"):
-        print("CRITICAL ERROR: GROQ_API_KEY is missing in environment!")
-    
-    # Enhanced prompt for comprehensive proposal extraction
-    system = """You are a smart sales assistant analyzing a proposal request. Extract the following information from the user's message:
+        logger.error("GROQ_API_KEY is missing in environment!")
     
-    Basic Info:
-    - client_name: Name of the company/client
-    - deal_type: Type of deal (e.g. Software, Consulting, Implementation)
-    - budget: Budget amount (number)
-    - timeline: Timeline (e.g. Q1, ASAP, 3 months)
+    known = [field for field in _EXTRACTED_FIELDS if state.get(field)]
+    human = f"Already known: {', '.join(known) or 'nothing'}\nUser Request: {user_request}"
+    # Raw messages: the system prompt's JSON format line would otherwise be parsed as template variables
+    messages = [COLLECT_INTENT_SYSTEM_MESSAGE, HumanMessage(content=human)]
     
-    Proposal Sections (extract if mentioned):
-    - proposal_title: Title of the proposal
-    - problem_statement: Problem being solved
-    - solution_overview: High-level solution description
-    - architecture_approach: Technical architecture or approach
-    - pricing_details: Pricing information
-    - compliance_info: Compliance requirements
-    - terms_conditions: Terms and conditions
-    - conclusion: Conclusion or next steps
-    
-    Return ONLY valid JSON. Use null for missing values. Do NOT wrap in markdown code blocks.
-    Format: {"client_name": ..., "deal_type": ..., "budget": ..., "timeline": ..., "proposal_title": ..., "problem_statement": ..., "solution_overview": ..., "architecture_approach": ..., "pricing_details": ..., "compliance_info": ..., "terms_conditions": ..., "conclusion": ...}
-    """
-    human = f"User Request: {user_request}"
-    prompt = ChatPromptTemplate.from_messages([("system", system), ("human", human)])
-    chain = prompt | llm | StrOutputParser()
-    
-    extracted = {}
-    try:
-        response = chain.invoke({})
-        print(f"DEBUG LLM Response (Extraction): {response}")
-        
-        # Cleanup markdown if present
-        json_str = response.strip()
-        if "```json" in json_str:
-            json_str = json_str.split("```json")[1].split("```")[0]
-        elif "```" in json_str:
-            json_str = json_str.split("```")[1].split("```")[0]
-            
-        extracted = json.loads(json_str)
-        print(f"DEBUG Extracted JSON: {extracted}")
-        
-    except Exception as e:
-        print(f"ERROR: LLM Extraction failed: {e}")
-        # Proceed with empty extracted to rely on state
-        pass
+    # With the client already known, the CRM lookup runs under the LLM call instead of after it
+    client_name = state.get("client_name")
+    crm_data = None
+    if client_name and not state.get("crm_data"):
+        extracted, crm_data = await asyncio.gather(
+            _extract_intent(messages),
+            MockCRM.get_client_data(client_name),
+        )
+    else:
+        extracted = await _extract_intent(messages)
 
     # Merge extracted info with existing state
     updates = {}
     
-    # Basic info
-    for field in ["client_name", "deal_type", "budget", "timeline"]:
+    # Prefetched CRM data only applies if this message didn't name a different client
+    if crm_data is not None and extracted.get("client_name") in (None, client_name):
+        updates["crm_data"] = crm_data
+    
+    # Basic info, recording each filled field in the bitmask
+    filled_mask = state.get("filled_mask", 0)
+    for bit_index, field in enumerate(REQUIRED_FIELDS):
         if extracted.get(field):
             updates[field] = extracted[field]
+            filled_mask |= 1 << bit_index
+    updates["filled_mask"] = filled_mask
     
     # Proposal sections
-    for field in ["proposal_title", "problem_statement", "solution_overview", "architecture_approach", 
-                  "pricing_details", "compliance_info", "terms_conditions", "conclusion"]:
+    for field in _SECTION_FIELDS:
         if extracted.get(field):
             updates[field] = extracted[field]
     
     # Handle image uploads if present
     if "image_base64" in state and "image_note" in state:
-        image_data = {
-            "base64": state["image_base64"],
-            "description": state["image_note"],
-            "section": "general"  # Will be categorized later
-        }
-        updates["uploaded_images"] = state.get("uploaded_images", []) + [image_data]
+        # Section "general"; will be categorized later
+        try:
+            image_data = image_from_upload(state["image_base64"], state["image_note"])
+        except ValueError as e:
+            logger.error("Ignoring uploaded image that is not valid base64: %s", e)
+        else:
+            updates["uploaded_images"] = state.get("uploaded_images", []) + [image_data]
+    
+    # Asked by ask_user without a second LLM call
+    updates["suggested_question"] = extracted.get("next_question") or None
     
     updates["current_step"] = "check_missing_info"
-    updates["audit_log"] = state.get("audit_log", []) + [f"Collected intent from user request: {user_request[:100]}..."]
+    updates["audit_log"] = [f"Collected intent from user request: {user_request[:100]}..."]
     
     return updates
 
-def fetch_crm(state: ProposalState) -> Dict:
+async def fetch_crm(state: ProposalState) -> Dict:
     """Fetches client data from the Mock CRM."""
-    print(f"--- Node: fetch_crm ---")
+    logger.debug("Node: fetch_crm")
     client_name = state.get("client_name")
     if not client_name:
-        return {"audit_log": state.get("audit_log", []) + ["Client name is missing."]}
+        return {"audit_log": ["Client name is missing."]}
+    
+    # Already prefetched by collect_intent
+    if (state.get("crm_data") or {}).get("name") == client_name:
+        return {
+            "current_step": "fetch_crm",
+            "audit_log": [f"Fetched CRM data for {client_name}."]
+        }
         
-    data = MockCRM.get_client_data(client_name)
+    data = await MockCRM.get_client_data(client_name)
     return {
         "crm_data": data,
         "current_step": "fetch_crm",
-        "audit_log": state.get("audit_log", []) + [f"Fetched CRM data for {client_name}."]
+        "audit_log": [f"Fetched CRM data for {client_name}."]
     }
 
 def check_missing_info(state: ProposalState) -> Dict:
     """Checks for missing basic info and comprehensive proposal sections."""
-    print(f"--- Node: check_missing_info ---")
-    
-    # Basic required fields
-    basic_required = ["client_name", "deal_type", "budget", "timeline"]
-    
-    # Comprehensive proposal sections
-    proposal_sections = ["proposal_title", "problem_statement", "solution_overview", 
-                        "architecture_approach", "pricing_details", "compliance_info", 
-                        "terms_conditions", "conclusion"]
+    logger.debug("Node: check_missing_info")
     
-    missing = []
-    
-    # Check basic fields
-    for field in basic_required:
-        if not state.get(field):
-            missing.append(field)
-    
-    # Check proposal sections - only add to missing if we have basic info
-    if not missing:  # Only check proposal sections if basic info is complete
-        for section in proposal_sections:
-            if not state.get(section):
-                missing.append(section)
+    # filled_mask has bit i set once REQUIRED_FIELDS[i] has a value (see collect_intent)
+    missing_mask = ALL_REQUIRED_MASK & ~state.get("filled_mask", 0)
+    if missing_mask:
+        missing = missing_fields_from_mask(missing_mask)
+    else:
+        # Only check proposal sections if basic info is complete
+        missing = [section for section in _SECTION_FIELDS if not state.get(section)]
     
-    print(f"DEBUG Missing Fields: {missing}")
+    logger.debug("Missing Fields: %s", missing)
     
     return {
         "missing_fields": missing,
         "current_step": "check_missing_info",
-        "audit_log": state.get("audit_log", []) + [f"Checked for missing info. Missing: {missing}"]
+        "audit_log": [f"Checked for missing info. Missing: {missing}"]
     }
 
-def ask_user(state: ProposalState) -> Dict:
+async def ask_user(state: ProposalState) -> Dict:
     """Generates dynamic questions for missing basic info and comprehensive proposal sections."""
-    print(f"--- Node: ask_user ---")
+    logger.debug("Node: ask_user")
     missing = state.get("missing_fields", [])
     user_request = state.get("user_request", "")
     
@@ -166,110 +273,99 @@ def ask_user(state: ProposalState) -> Dict:
         return {
             "current_step": "ask_user",
             "current_question": "I have all the info. Should I generate the draft?",
-            "audit_log": state.get("audit_log", [])
+            "audit_log": []
         }
     
-    # Enhanced prompt for comprehensive proposal sections
-    system = f"""You are 'Northstar', an intelligent and friendly sales agent.
-    
-    Current Information:
-    - Client: {state.get("client_name") or "Unknown"}
-    - Deal Type: {state.get("deal_type") or "Unknown"}
-    - Budget: {state.get("budget") or "Unknown"}
-    - Timeline: {state.get("timeline") or "Unknown"}
-    
-    Missing Information: {', '.join(missing)}
-    
-    The user just said: "{user_request}"
-    
-    Your Goal:
-    1. If the user provided new info, acknowledge it briefly
-    2. Ask for the NEXT missing piece of information ({missing[0]})
-    3. Be conversational and specific
-    4. For proposal sections, ask detailed questions
-    5. Mention they can upload images if relevant
-    6. Keep it concise but engaging
+    # collect_intent already asked the LLM for the next question in its extraction call
+    suggested = state.get("suggested_question")
+    if suggested:
+        return {
+            "current_step": "ask_user",
+            "current_question": suggested,
+            "suggested_question": None,
+            "audit_log": [f"Asked user: {suggested}"]
+        }
     
-    Question Examples:
-    - For proposal_title: "What would you like to title this proposal?"
-    - For problem_statement: "What specific problem are we solving for the client?"
-    - For solution_overview: "Can you describe the high-level solution approach?"
-    - For architecture_approach: "What's the technical architecture or methodology we'll use?"
-    - For pricing_details: "How should we structure the pricing breakdown?"
-    - For compliance_info: "Are there any specific compliance requirements?"
-    - For terms_conditions: "What terms and conditions should we include?"
-    - For conclusion: "What should be the main takeaway or call to action?"
-    """
+    variables = {
+        "client_name": state.get("client_name") or "Unknown",
+        "deal_type": state.get("deal_type") or "Unknown",
+        "budget": state.get("budget") or "Unknown",
+        "timeline": state.get("timeline") or "Unknown",
+        "missing": ", ".join(missing),
+        "user_request": user_request,
+    }
     
-    prompt = ChatPromptTemplate.from_messages([("system", system)])
-    chain = prompt | llm | StrOutputParser()
+    # Keyed on every prompt variable, so a question written for one conversation
+    # (which may quote its budget or last message) is never served to another
+    cache_key = tuple(variables.values())
+    question = _question_cache.get(cache_key)
+    if question is not None:
+        return {
+            "current_step": "ask_user",
+            "current_question": question,
+            "audit_log": [f"Asked user: {question}"]
+        }
     
     try:
-        question = chain.invoke({})
-        print(f"DEBUG LLM Question: {question}")
+        async with _llm_semaphore:
+            question = await ASK_USER_CHAIN.ainvoke(variables)
+        _question_cache[cache_key] = question
+        logger.debug("LLM Question: %s", question)
     except Exception as e:
-        print(f"ERROR: LLM Question Generation failed: {e}")
+        logger.error("LLM Question Generation failed: %s", e)
         # Comprehensive fallback questions
         field = missing[0]
-        question_map = {
-            "client_name": "Who is the client for this proposal?",
-            "deal_type": "What kind of deal or service are we proposing?",
-            "budget": "Do you have a specific budget in mind?",
-            "timeline": "When are you looking to start this project?",
-            "proposal_title": "What would you like to title this proposal?",
-            "problem_statement": "What specific problem are we solving for the client?",
-            "solution_overview": "Can you describe the high-level solution approach?",
-            "architecture_approach": "What's the technical architecture or methodology we'll use?",
-            "pricing_details": "How should we structure the pricing breakdown?",
-            "compliance_info": "Are there any specific compliance requirements we need to address?",
-            "terms_conditions": "What terms and conditions should we include?",
-            "conclusion": "What should be the main takeaway or call to action?"
-        }
-        question = question_map.get(field, f"Can you tell me more about {field.replace('_', ' ')}?")
+        question = QUESTION_MAP.get(field, f"Can you tell me more about {field.replace('_', ' ')}?")
     
     return {
         "current_step": "ask_user",
         "current_question": question,
-        "audit_log": state.get("audit_log", []) + [f"Asked user: {question}"]
+        "audit_log": [f"Asked user: {question}"]
     }
 
 def generate_draft(state: ProposalState) -> Dict:
     """Generates a comprehensive draft using all collected proposal sections."""
-    print(f"--- Node: generate_draft ---")
-    
-    # Get all the comprehensive information
-    client = state.get("client_name", "Client")
-    deal_type = state.get("deal_type", "Service")
-    budget = state.get("budget", 0)
-    timeline = state.get("timeline", "ASAP")
-    industry = state.get("crm_data", {}).get("industry", "Business")
-    
-    # Proposal sections
-    proposal_title = state.get("proposal_title", f"Proposal for {client}")
-    problem_statement = state.get("problem_statement", "Addressing client business needs")
-    solution_overview = state.get("solution_overview", "Comprehensive solution approach")
-    architecture_approach = state.get("architecture_approach", "Technical implementation strategy")
-    pricing_details = state.get("pricing_details", f"Total investment: ${budget:,.2f}")
-    compliance_info = state.get("compliance_info", "Standard compliance requirements")
-    terms_conditions = state.get("terms_conditions", "Standard terms and conditions")
-    conclusion = state.get("conclusion", "Next steps and call to action")
+    logger.debug("Node: generate_draft")
+    get = state.get
+    
+    # Get all the comprehensive information (falling back when a key is absent or None)
+    client = get("client_name") or "Client"
+    budget = get("budget") or 0
+    
+    # Same layout as the live workflow's drafts
+    parts = [DRAFT_TEMPLATE.substitute(
+        title=(get("proposal_title") or f"Proposal for {client}").upper(),
+        client=client,
+        industry=(get("crm_data") or {}).get("industry", "Business"),
+        deal_type=get("deal_type") or "Service",
+        timeline=get("timeline") or "ASAP",
+        problem_statement=get("problem_statement") or "Addressing client business needs",
+        solution_overview=get("solution_overview") or "Comprehensive solution approach",
+        architecture_approach=get("architecture_approach") or "Technical implementation strategy",
+        pricing_details=get("pricing_details") or f"Total investment: ${budget:,.2f}",
+        compliance_info=get("compliance_info") or "Standard compliance requirements",
+        terms_conditions=get("terms_conditions") or "Standard terms and conditions",
+        conclusion=get("conclusion") or "Next steps and call to action",
+    )]
     
     # Handle uploaded images
-    uploaded_images = state.get("uploaded_images", [])
-    image_references = ""
+    uploaded_images = get("uploaded_images") or []
     if uploaded_images:
-        image_references = "\n\n## Attachments & Visual References\n"
-        for i, img in enumerate(uploaded_images, 1):
-            image_references += f"- Image {i}: {img.get('description', 'Uploaded image')}\n"
+        parts.append("\n\n## Attachments & Visual References\n")
+        parts.extend(
+            f"- Image {i}: {img.get('description', 'Uploaded image')}\n"
+            for i, img in enumerate(uploaded_images, 1)
+        )
     
-    # Generate comprehensive draft
-    draft = f"""# {proposal_title.upper()}
-        "audit_log": state.get("audit_log", [])
+    return {
+        "draft_v1": "".join(parts),
+        "current_step": "generate_draft",
+        "audit_log": ["Generated comprehensive proposal draft."]
     }
 
 def review_proposal(state: ProposalState) -> Dict:
     """Presents the proposal to the user for review before admin."""
-    print(f"--- Node: review_proposal ---")
+    logger.debug("Node: review_proposal")
     
     # Dynamic review message
     msg = "I've generated a draft proposal based on your requirements. Please review the document. If it looks good, just say 'Approve' or 'Proceed'. If you need any changes, let me know!"
@@ -277,43 +373,43 @@ def review_proposal(state: ProposalState) -> Dict:
     return {
         "current_question": msg,
         "current_step": "review_proposal",
-        "audit_log": state.get("audit_log", []) + ["Presented draft to user for review."]
+        "audit_log": ["Presented draft to user for review."]
     }
 
 def handle_feedback(state: ProposalState) -> Dict:
     """Routes based on user review feedback."""
-    print(f"--- Node: handle_feedback ---")
-    last_msg = state.get("user_request", "").lower()
+    logger.debug("Node: handle_feedback")
+    last_msg = state.get("user_request", "")
     
     # Simple keyword matching for approval
-    if "approve" in last_msg or "looks good" in last_msg or "proceed" in last_msg or "yes" in last_msg:
+    if APPROVAL_RE.search(last_msg):
          return {
              "approval_status": "user_approved",
              "current_step": "handle_feedback",
-             "audit_log": state.get("audit_log", []) + ["User approved draft. Proceeding to admin."]
+             "audit_log": ["User approved draft. Proceeding to admin."]
          }
     else:
         # If feedback involves changes, we might want to feed that back into 'collect_intent' logic implicitly
         # The 'collect_intent' node will run next and should pick up changes if the user says "Change budget to 50k"
         return {
              "current_step": "handle_feedback",
-             "audit_log": state.get("audit_log", []) + ["User requested changes/feedback."]
+             "audit_log": ["User requested changes/feedback."]
          }
 
 def wait_for_approval(state: ProposalState) -> Dict:
     """Sets status to pending admin approval. All proposals with pricing/compliance go here."""
-    print(f"--- Node: wait_for_approval ---")
+    logger.debug("Node: wait_for_approval")
     return {
         "approval_status": "pricing_review",
         "current_step": "wait_for_approval",
-        "audit_log": state.get("audit_log", []) + [
+        "audit_log": [
             "Submitted for Admin Review (Pricing, Margin, Compliance Approval)."
         ]
     }
 
 def revise_draft(state: ProposalState) -> Dict:
     """Revises the draft based on approval comments of compliance feedback."""
-    print(f"--- Node: revise_draft ---")
+    logger.debug("Node: revise_draft")
     original_draft = state.get("draft_v1", "")
     comments = state.get("approval_comments", "")
     
@@ -322,16 +418,16 @@ def revise_draft(state: ProposalState) -> Dict:
     return {
         "draft_v2": revised_draft,
         "current_step": "revise_draft",
-        "audit_log": state.get("audit_log", []) + ["Revised draft based on admin approval feedback."]
+        "audit_log": ["Revised draft based on admin approval feedback."]
     }
 
 def finalize_proposal(state: ProposalState) -> Dict:
     """Finalizes the proposal for sending."""
-    print(f"--- Node: finalize_proposal ---")
+    logger.debug("Node: finalize_proposal")
     final_draft = state.get("draft_v2") or state.get("draft_v1")
     return {
         "final_draft": final_draft,
         "approval_status": "finalized",
         "current_step": "finalize_proposal",
-        "audit_log": state.get("audit_log", []) + ["Proposal Finalized and Ready to Send."]    
+        "audit_log": ["Proposal Finalized and Ready to Send."]    
     }
\ No newline at end of file
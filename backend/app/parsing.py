@@ -0,0 +1,126 @@
+import functools
+import re
+from typing import Any, Dict, Optional, Tuple
+
+import json5
+import orjson
+
+# Longest suffix first so "thousand" wins over a bare trailing letter
+_BUDGET_SUFFIXES = (("thousand", 1000), ("million", 1000000), ("k", 1000), ("m", 1000000))
+# One "field_name: value" pair per line of a summary-style response. Only spaces and tabs
+# around the colon, so an empty value never swallows the next line.
+_SUMMARY_LINE_RE = re.compile(r"^[ \t\-*]*([a-z_]+)[ \t]*:[ \t]*(.*?)[ \t]*$", re.MULTILINE)
+_EMPTY_VALUES = frozenset(("", "null", "none", "n/a", "unknown"))
+
+
+def strip_code_fence(response: str) -> str:
+    """Return the body of the first markdown code fence in the response, or the whole response."""
+    start = response.find("```")
+    if start == -1:
+        return response.strip()
+    body_start = start + 3
+    if response.startswith("json", body_start):
+        body_start += 4
+    end = response.find("```", body_start)
+    return response[body_start:end if end != -1 else len(response)].strip()
+
+
+def parse_budget(value: str) -> Optional[float]:
+    """Parse a budget string like "$50k", "1.5 million" or "20,000" into a number."""
+    budget_str = value.lower().strip()
+    multiplier = 1
+    for suffix, factor in _BUDGET_SUFFIXES:
+        if budget_str.endswith(suffix):
+            budget_str = budget_str[:-len(suffix)]
+            multiplier = factor
+            break
+    try:
+        num = float(budget_str.replace(",", "").replace("$", "").strip())
+    except ValueError:
+        return None
+    # Scaled amounts are whole currency units
+    return int(num * multiplier) if multiplier != 1 else num
+
+
+@functools.lru_cache(maxsize=None)
+def _field_patterns(fields: Tuple[str, ...]) -> tuple:
+    """Per-field pulls (string or number value) for responses that are not valid JSON as a whole."""
+    return tuple(
+        (field, re.compile(rf'"{field}"\s*:\s*(?:"((?:[^"\\]|\\.)*)"|(-?\d+(?:\.\d+)?))'))
+        for field in fields
+    )
+
+
+def _parse_summary(response: str, fields: Tuple[str, ...]) -> Dict:
+    """Read the "field_name: value" lines of a response; unknown keys and empty values are skipped.
+
+    Returns nothing for JSON-like replies ({...}, or values with a trailing comma), which
+    would otherwise be misread line by line.
+    """
+    if strip_code_fence(response).startswith("{"):
+        return {}
+    extracted = {}
+    for field, value in _SUMMARY_LINE_RE.findall(response):
+        if value.endswith(","):
+            return {}
+        if field in fields and value.lower() not in _EMPTY_VALUES:
+            extracted[field] = value
+    return extracted
+
+
+def _parse_json(response: str, fields: Tuple[str, ...]) -> Dict:
+    """Salvage the known fields from a (possibly malformed) JSON response."""
+    json_str = strip_code_fence(response)
+    try:
+        data = orjson.loads(json_str)
+    except orjson.JSONDecodeError:
+        data = None
+    if data is None:
+        # Trailing commas, single quotes and unquoted keys; far cheaper than re-asking the LLM
+        try:
+            data = json5.loads(json_str)
+        except ValueError:
+            pass
+    if data is None:
+        extracted = {}
+        for field, pattern in _field_patterns(fields):
+            match = pattern.search(json_str)
+            if match is None:
+                continue
+            text, number = match.groups()
+            if number is not None:
+                extracted[field] = float(number)
+            else:
+                try:
+                    extracted[field] = orjson.loads(f'"{text}"')
+                except orjson.JSONDecodeError:
+                    extracted[field] = text
+        return extracted
+    if not isinstance(data, dict):
+        return {}
+    return {field: data[field] for field in fields if data.get(field) is not None}
+
+
+def _budget_amount(value: Any) -> Optional[float]:
+    """Numeric budget from a parsed response value, or None if it is not an amount."""
+    if isinstance(value, bool):
+        return None
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, str):
+        return parse_budget(value)
+    return None
+
+
+def parse_extraction(response: str, fields: Tuple[str, ...]) -> Dict:
+    """Pull the given fields out of an LLM extraction response.
+
+    Tries "field_name: value" lines first, then JSON (strict, then JSON5, then per field).
+    """
+    extracted = _parse_summary(response, fields) or _parse_json(response, fields)
+    # Every path yields a number or no budget at all: drafts format it with :,.2f
+    if "budget" in extracted:
+        budget = _budget_amount(extracted.pop("budget"))
+        if budget is not None:
+            extracted["budget"] = budget
+    return extracted
@@ -1,7 +1,12 @@
-from typing import TypedDict, List, Dict, Optional
+import base64
+from collections import deque
+from dataclasses import dataclass, field
+import operator
+from typing import Annotated, Required, TypedDict, List, Dict, Optional, Deque, Iterable, Tuple
 
-class ProposalState(TypedDict):
-    user_request: str
+# Keys are filled in as the graph runs, so only user_request is guaranteed present
+class ProposalState(TypedDict, total=False):
+    user_request: Required[str]
     client_name: Optional[str]
     deal_type: Optional[str]
     budget: Optional[float]
@@ -18,7 +23,7 @@ class ProposalState(TypedDict):
     conclusion: Optional[str]
     
     # Media handling
-    uploaded_images: List[Dict]  # List of {base64: str, description: str, section: str}
+    uploaded_images: List[Dict]  # List of image_from_upload() dicts: {data: bytes, media_type, description, section}
     
     crm_data: Optional[Dict]
     pricing: Optional[Dict]
@@ -32,12 +37,144 @@ class ProposalState(TypedDict):
     approval_comments: Optional[str]
 
     missing_fields: List[str]
+    filled_mask: int  # Bit i set once crew_system.REQUIRED_FIELDS[i] has a value
     pending_questions: List[str]  # Questions waiting for user response
     current_question: Optional[str]  # Currently asked question
+    suggested_question: Optional[str]  # Next question returned alongside the extraction
     current_step: str
-    audit_log: List[str]
+    # Nodes return only their new entries; LangGraph appends them via the reducer
+    audit_log: Annotated[List[str], operator.add]
     
     # Pricing and compliance details for admin review
     proposed_margin: Optional[float]
     proposed_base_cost: Optional[float]
     compliance_issues: Optional[List[str]]
+
+
+# Audit log event codes. ProposalRecord stores (code, param) tuples and they
+# are only rendered to text when the state leaves the API.
+AUDIT_STARTED = 0
+AUDIT_PROCESSED = 1
+AUDIT_CRM_FETCHED = 2
+AUDIT_ASKED_USER = 3
+AUDIT_SUBMITTED = 4
+AUDIT_DRAFT_ERROR = 5
+AUDIT_FINALIZED = 6
+AUDIT_REJECTED = 7
+
+AUDIT_MESSAGES = (
+    "Proposal started with request: {}",
+    "Processed user input: {}...",
+    "Fetched CRM data for {}",
+    "Asked user: {}",
+    "Submitted for Admin Review (Pricing, Margin, Compliance Approval)",
+    "Error during draft generation: {}",
+    "Proposal Finalized and Ready to Send.",
+    "Admin REJECTED: {}",
+)
+
+# Oldest entries are dropped once a proposal's log reaches this size
+AUDIT_LOG_MAXLEN = 200
+
+
+def new_audit_log() -> Deque[Tuple[int, str]]:
+    return deque(maxlen=AUDIT_LOG_MAXLEN)
+
+
+def render_audit_log(entries: Iterable[Tuple[int, str]]) -> List[str]:
+    """Convert (code, param) audit entries to display strings."""
+    return [AUDIT_MESSAGES[code].format(param) for code, param in entries]
+
+
+def image_from_upload(payload: str, description: str, section: str = "general") -> Dict:
+    """Decode an uploaded image (bare base64 or a data: URL) so it is stored as raw bytes."""
+    header, sep, encoded = payload.partition(",")
+    if sep and header.startswith("data:"):
+        media_type = header[5:].split(";", 1)[0] or None
+    else:
+        media_type, encoded = None, payload
+    return {
+        # Line-wrapped (MIME-style) payloads are fine; anything else non-base64 raises ValueError
+        "data": base64.b64decode("".join(encoded.split()), validate=True),
+        "media_type": media_type,
+        "description": description,
+        "section": section,
+    }
+
+
+def image_to_b64(image: Dict) -> Dict:
+    """API view of a stored image, base64-encoding its bytes back into the form it was uploaded in."""
+    encoded = base64.b64encode(image["data"]).decode("ascii")
+    if image.get("media_type"):
+        encoded = f"data:{image['media_type']};base64,{encoded}"
+    return {"base64": encoded, "description": image["description"], "section": image["section"]}
+
+
+@dataclass(slots=True)
+class ProposalRecord:
+    """In-memory state for one proposal conversation (see crew_system.process_proposal)."""
+    user_request: str = ""
+    audit_log: Deque[Tuple[int, str]] = field(default_factory=new_audit_log)
+    current_step: str = "collecting_info"
+    missing_fields: List[str] = field(default_factory=list)
+    current_question: Optional[str] = None
+    budget: Optional[float] = None
+    client_name: Optional[str] = None
+    deal_type: Optional[str] = None
+    timeline: Optional[str] = None
+
+    proposal_title: Optional[str] = None
+    problem_statement: Optional[str] = None
+    solution_overview: Optional[str] = None
+    architecture_approach: Optional[str] = None
+    pricing_details: Optional[str] = None
+    compliance_info: Optional[str] = None
+    terms_conditions: Optional[str] = None
+    conclusion: Optional[str] = None
+
+    # Raw image bytes; see image_from_upload
+    uploaded_images: List[Dict] = field(default_factory=list)
+
+    crm_data: Optional[Dict] = None
+    pricing: Optional[Dict] = None
+    compliance_status: Optional[Dict] = None
+
+    draft_v1: Optional[str] = None
+    draft_v2: Optional[str] = None
+    final_draft: Optional[str] = None
+
+    approval_status: Optional[str] = None
+    approval_comments: Optional[str] = None
+
+    proposed_margin: Optional[float] = None
+    proposed_base_cost: Optional[float] = None
+    compliance_issues: Optional[List[str]] = None
+
+    # Cached ETag of the current state; cleared by touch() after every mutation
+    etag: Optional[str] = None
+
+    def touch(self) -> None:
+        """Mark the record as changed so its ETag is recomputed on the next read."""
+        self.etag = None
+
+    def to_dict(self, include_images: bool = False) -> Dict:
+        """Plain dict view for API responses. Image payloads are only base64-encoded when requested."""
+        data = {name: getattr(self, name) for name in self.__slots__ if name != "etag"}
+        data["audit_log"] = render_audit_log(self.audit_log)
+        if include_images:
+            data["uploaded_images"] = [image_to_b64(image) for image in self.uploaded_images]
+        else:
+            data["uploaded_images"] = [
+                {"description": image["description"], "section": image["section"]}
+                for image in self.uploaded_images
+            ]
+        return data
+
+
+@dataclass(slots=True)
+class ProposalMeta:
+    """Admin UI index entry for a proposal. timestamp is the last update (epoch seconds)."""
+    client_name: Optional[str]
+    status: Optional[str]
+    approval_status: Optional[str]
+    timestamp: float = 0.0
@@ -0,0 +1,78 @@
+import sqlite3
+from collections import OrderedDict
+from typing import Callable, List, Optional, Tuple
+
+from .state import ProposalMeta, ProposalRecord
+
+
+class ProposalStore:
+    """Live proposals keyed by thread id, bounded by evicting the least recently used."""
+
+    def __init__(self, maxsize: int, on_evict: Optional[Callable[[str], None]] = None):
+        self.maxsize = maxsize
+        # Called with the thread id of each evicted proposal (e.g. to drop its index row)
+        self.on_evict = on_evict
+        self._data: "OrderedDict[str, ProposalRecord]" = OrderedDict()
+
+    def __contains__(self, thread_id: object) -> bool:
+        return thread_id in self._data
+
+    def __getitem__(self, thread_id: str) -> ProposalRecord:
+        record = self._data[thread_id]
+        self._data.move_to_end(thread_id)
+        return record
+
+    def __setitem__(self, thread_id: str, record: ProposalRecord) -> None:
+        self._data[thread_id] = record
+        self._data.move_to_end(thread_id)
+        while len(self._data) > self.maxsize:
+            evicted, _ = self._data.popitem(last=False)
+            if self.on_evict is not None:
+                self.on_evict(evicted)
+
+
+class ProposalIndex:
+    """Admin UI index of proposals, kept in an in-memory SQLite table indexed on status."""
+
+    def __init__(self):
+        self._conn = sqlite3.connect(":memory:", check_same_thread=False, isolation_level=None)
+        self._conn.executescript(
+            """
+            CREATE TABLE proposals (
+                id TEXT PRIMARY KEY,
+                client_name TEXT,
+                status TEXT,
+                approval_status TEXT,
+                ts REAL
+            );
+            CREATE INDEX ix_status ON proposals(status);
+            """
+        )
+
+    def upsert(self, thread_id: str, meta: ProposalMeta) -> None:
+        self._conn.execute(
+            "INSERT OR REPLACE INTO proposals (id, client_name, status, approval_status, ts) VALUES (?, ?, ?, ?, ?)",
+            (thread_id, meta.client_name, meta.status, meta.approval_status, meta.timestamp),
+        )
+
+    def update(self, thread_id: str, **fields) -> None:
+        """Update the given ProposalMeta fields of an existing entry; no-op if it is absent."""
+        if not fields:
+            return
+        columns = {"timestamp": "ts"}
+        assignments = ", ".join(f"{columns.get(name, name)} = ?" for name in fields)
+        self._conn.execute(
+            f"UPDATE proposals SET {assignments} WHERE id = ?",
+            (*fields.values(), thread_id),
+        )
+
+    def delete(self, thread_id: str) -> None:
+        self._conn.execute("DELETE FROM proposals WHERE id = ?", (thread_id,))
+
+    def with_status(self, status: str) -> List[Tuple[str, ProposalMeta]]:
+        """All entries in the given status, served from the ix_status index."""
+        rows = self._conn.execute(
+            "SELECT id, client_name, status, approval_status, ts FROM proposals WHERE status = ?",
+            (status,),
+        ).fetchall()
+        return [(row[0], ProposalMeta(*row[1:])) for row in rows]
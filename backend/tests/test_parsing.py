@@ -0,0 +1,55 @@
+import unittest
+
+from app.parsing import parse_budget, parse_extraction
+
+FIELDS = ("client_name", "deal_type", "budget", "timeline", "next_question")
+
+
+class ParseBudgetTest(unittest.TestCase):
+    def test_suffixes_and_separators(self):
+        self.assertEqual(parse_budget("$50k"), 50000)
+        self.assertEqual(parse_budget("1.5 million"), 1500000)
+        self.assertEqual(parse_budget("20,000"), 20000.0)
+
+    def test_not_an_amount(self):
+        self.assertIsNone(parse_budget("flexible"))
+
+
+class ParseExtractionTest(unittest.TestCase):
+    def test_summary_lines(self):
+        response = "client_name: Acme Corp\n- budget: $50k\ntimeline: null\nnext_question: When do you start?"
+        self.assertEqual(parse_extraction(response, FIELDS), {
+            "client_name": "Acme Corp",
+            "budget": 50000.0,
+            "next_question": "When do you start?",
+        })
+
+    def test_empty_value_does_not_take_the_next_line(self):
+        response = "client_name:\ndeal_type: Consulting"
+        self.assertEqual(parse_extraction(response, FIELDS), {"deal_type": "Consulting"})
+
+    def test_unknown_keys_are_ignored(self):
+        self.assertEqual(parse_extraction("note: hello\ntimeline: Q3", FIELDS), {"timeline": "Q3"})
+
+    def test_json_with_string_budget(self):
+        response = '```json\n{"client_name": "Acme", "budget": "50k", "timeline": null}\n```'
+        self.assertEqual(parse_extraction(response, FIELDS), {"client_name": "Acme", "budget": 50000.0})
+
+    def test_json5_is_not_read_as_summary_lines(self):
+        response = "{\n  client_name: 'Acme',\n  budget: 25000,\n}"
+        self.assertEqual(parse_extraction(response, FIELDS), {"client_name": "Acme", "budget": 25000.0})
+
+    def test_comma_terminated_lines_are_not_summary_values(self):
+        response = 'client_name: "Acme",\nbudget: 12000,'
+        self.assertEqual(parse_extraction(response, FIELDS), {})
+
+    def test_unparseable_budget_is_dropped(self):
+        self.assertEqual(parse_extraction("budget: flexible\ntimeline: ASAP", FIELDS), {"timeline": "ASAP"})
+        self.assertEqual(parse_extraction('{"budget": "tbd"}', FIELDS), {})
+
+    def test_unrecognized_reply(self):
+        self.assertEqual(parse_extraction("Sorry, I could not find anything.", FIELDS), {})
+
+
+if __name__ == "__main__":
+    unittest.main()